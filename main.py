@@ -1,11 +1,31 @@
 import os
+import json
+import time
+import hashlib
+import random
 import asyncio
 import logging
 from typing import Optional
+from functools import lru_cache
+from collections import OrderedDict
+from uuid import uuid4
 from dataclasses import dataclass
 
+import aiohttp
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+from azure.core.pipeline.transport import AioHttpTransport
 from azure.cosmos.aio import CosmosClient
+from azure.cosmos.documents import ConnectionMode
+from azure.cosmos.exceptions import CosmosHttpResponseError
 from dotenv import load_dotenv
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 from pydantic import AnyUrl
 
 from mcp.server.models import InitializationOptions
@@ -18,7 +38,7 @@ from mcp.types import (
 import mcp.types as types
 from mcp.server.session import ServerSession
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 import uvicorn
 
 # Load environment variables
@@ -28,276 +48,863 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(frozen=True)
 class CosmosConfig:
     """Configuration for Azure Cosmos DB connection"""
     endpoint: str
     key: str
     database_name: str
     container_name: str
-    consistency_level: str = "Session"
+    # None defers to the account's default consistency level
+    consistency_level: Optional[str] = None
     connection_mode: str = "Gateway"
+    # Regions to route requests to, nearest first
+    preferred_locations: tuple[str, ...] = ()
 
-@dataclass
+@dataclass(frozen=True)
 class ServerConfig:
     """Configuration for HTTP server"""
     host: str = "localhost"
     port: int = 8000
     log_level: str = "info"
+    access_log: bool = False
+
+@lru_cache(maxsize=1)
+def get_cosmos_config() -> CosmosConfig:
+    """Load Cosmos DB configuration from environment variables once per process"""
+    required = ("COSMOS_ENDPOINT", "COSMOS_KEY", "COSMOS_DATABASE_NAME", "COSMOS_CONTAINER_NAME")
+    missing = [name for name in required if not os.environ.get(name)]
+    if missing:
+        raise ValueError(f"Missing required Cosmos DB configuration: {', '.join(missing)}. Please check your environment variables.")
+    
+    return CosmosConfig(
+        endpoint=os.environ["COSMOS_ENDPOINT"],
+        key=os.environ["COSMOS_KEY"],
+        database_name=os.environ["COSMOS_DATABASE_NAME"],
+        container_name=os.environ["COSMOS_CONTAINER_NAME"],
+        consistency_level=os.getenv("COSMOS_CONSISTENCY_LEVEL") or None,
+        connection_mode=os.getenv("COSMOS_CONNECTION_MODE", "Gateway"),
+        preferred_locations=tuple(
+            location.strip()
+            for location in os.getenv("COSMOS_PREFERRED_LOCATIONS", "").split(",")
+            if location.strip()
+        ),
+    )
+
+@lru_cache(maxsize=1)
+def get_server_config() -> ServerConfig:
+    """Load HTTP server configuration from environment variables once per process"""
+    return ServerConfig(
+        host=os.getenv("SERVER_HOST", "localhost"),
+        port=int(os.getenv("SERVER_PORT", "8000")),
+        log_level=os.getenv("LOG_LEVEL", "info"),
+        access_log=os.getenv("SERVER_ACCESS_LOG", "false").lower() == "true"
+    )
+
+# Process-wide Cosmos DB client. Building a CosmosClient fetches account and
+# partition metadata and opens a fresh connection pool, so it is created once
+# and shared by every CosmosDBMCPServer in the process.
+_cosmos_client: Optional[CosmosClient] = None
+_database = None
+_container = None
+_http_session: Optional[aiohttp.ClientSession] = None
+_cosmos_lock = asyncio.Lock()
+
+async def get_client(config: CosmosConfig):
+    """Return the shared (client, database, container), creating them on first call"""
+    global _cosmos_client, _database, _container, _http_session
+    
+    # Fast path once initialized; the globals are only ever set together
+    if _cosmos_client is not None:
+        return _cosmos_client, _database, _container
+    
+    async with _cosmos_lock:
+        # Re-check: another task may have finished initializing while we waited
+        if _cosmos_client is None:
+            # The Python async SDK only speaks Gateway (HTTPS); Direct/TCP is
+            # a .NET/Java feature, so a Direct request falls back to Gateway.
+            if config.connection_mode.lower() == "direct":
+                logger.warning("Direct connection mode is not supported by the Python async SDK, using Gateway")
+            
+            # The SDK's default aiohttp session drops idle sockets after 15s,
+            # so bursty tool calls keep paying for new TCP+TLS handshakes.
+            connector = aiohttp.TCPConnector(
+                limit=200,
+                limit_per_host=64,
+                keepalive_timeout=120,
+                enable_cleanup_closed=True,
+                ttl_dns_cache=300
+            )
+            # aiohttp already negotiates gzip/deflate (and br with brotli
+            # installed) and inflates responses; at DEBUG, log what the
+            # service actually sent so compression can be confirmed
+            trace_configs = []
+            if logger.isEnabledFor(logging.DEBUG):
+                trace_configs.append(_compression_trace_config())
+            session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=trace_configs
+            )
+            
+            # Only override consistency when asked to: an explicit level is
+            # rejected if it is stronger than the account's and silently
+            # weakens reads if it is weaker
+            client_kwargs = {}
+            if config.consistency_level is not None:
+                client_kwargs["consistency_level"] = config.consistency_level
+            
+            client = CosmosClient(
+                url=config.endpoint,
+                credential=config.key,
+                connection_mode=ConnectionMode.Gateway,
+                # Without Direct mode, reading from the nearest region is
+                # the main way left to cut round-trip time. Always pass a
+                # list: None replaces the SDK's [] default and breaks its
+                # error path with a TypeError that hides the real failure.
+                preferred_locations=list(config.preferred_locations),
+                transport=AioHttpTransport(session=session, session_owner=False),
+                **client_kwargs
+            )
+            
+            database = client.get_database_client(config.database_name)
+            container = database.get_container_client(config.container_name)
+            
+            # Test connection
+            try:
+                await database.read()
+            except Exception:
+                await client.close()
+                await session.close()
+                raise
+            logger.info(f"Successfully connected to Cosmos DB: {config.database_name}")
+            
+            _cosmos_client, _database, _container = client, database, container
+            _http_session = session
+        
+        return _cosmos_client, _database, _container
+
+def _compression_trace_config() -> aiohttp.TraceConfig:
+    """Trace config that logs each Cosmos DB response's encoding and wire size"""
+    async def on_request_end(session, context, params):
+        headers = params.response.headers
+        logger.debug(
+            f"{params.method} {params.url.path}: "
+            f"Content-Encoding={headers.get('Content-Encoding', 'identity')} "
+            f"Content-Length={headers.get('Content-Length', 'unknown')}"
+        )
+    
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+async def close_client():
+    """Close the shared Cosmos DB client and its HTTP session; only call at process shutdown"""
+    global _cosmos_client, _database, _container, _http_session
+    if _cosmos_client is not None:
+        await _cosmos_client.close()
+        _cosmos_client, _database, _container = None, None, None
+    # The transport does not own the session, so it must be closed here
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for Cosmos DB calls
+
+    The limit halves when Cosmos DB throttles (429) or is unavailable (503)
+    and creeps back up on every success, keeping in-flight requests near the
+    provisioned RU/s instead of oscillating between overload and idle.
+    """
+    
+    def __init__(self, limit: int, floor: int = 4, ceiling: int = 256):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.limit = float(min(max(limit, floor), ceiling))
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+    
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+    
+    def on_success(self):
+        """Additive increase"""
+        self.limit = min(self.ceiling, self.limit + 0.5)
+    
+    def on_throttle(self):
+        """Multiplicative decrease"""
+        self.limit = max(self.floor, self.limit * 0.5)
+
+class TTLCache:
+    """Small LRU cache whose entries also expire after ttl seconds"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value):
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def pop(self, key):
+        self._entries.pop(key, None)
+
+def _dumps_bytes(obj) -> bytes:
+    """Serialize to JSON bytes, with orjson's C encoder when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str).encode()
+
+def _loads(data: bytes):
+    """Parse JSON bytes, with orjson's C decoder when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _dumps(obj) -> str:
+    """Serialize to a JSON string, with orjson's C encoder when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str)
+
+# Status codes worth retrying: timeout, throttled, retry-with, unavailable
+RETRYABLE_STATUS_CODES = (408, 429, 449, 503)
+
+async def _retry(fn, attempts: int = 3, base: float = 0.1, cap: float = 2.0):
+    """Await fn() with jittered exponential backoff on transient Cosmos DB errors"""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except CosmosHttpResponseError as e:
+            if e.status_code not in RETRYABLE_STATUS_CODES or attempt == attempts - 1:
+                raise
+            # Prefer the server's retry hint over our own backoff
+            retry_after_ms = (e.headers or {}).get("x-ms-retry-after-ms")
+            delay = float(retry_after_ms) / 1000 if retry_after_ms else min(cap, base * 2 ** attempt)
+        except (ServiceRequestError, ServiceResponseError):
+            # Connection resets and other network failures
+            if attempt == attempts - 1:
+                raise
+            delay = min(cap, base * 2 ** attempt)
+        await asyncio.sleep(delay + random.random() * 0.05)
+
+# Size of the cosmosdb://documents sample; also used as its page size
+SAMPLE_DOCUMENT_COUNT = 10
+SAMPLE_DOCUMENTS_QUERY = f"SELECT TOP {SAMPLE_DOCUMENT_COUNT} * FROM c"
+
+# Cosmos DB rejects transactional batches with more operations than this
+MAX_BATCH_OPERATIONS = 100
+
+def _partition_key_value(document: dict, path: str):
+    """Extract the partition key value at a path like "/tenant/id" from a document"""
+    value = document
+    for part in path.strip("/").split("/"):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _parse_resource_usage(header: str) -> dict:
+    """Parse an x-ms-resource-usage header ("documentsCount=10;...") into ints"""
+    usage = {}
+    for pair in header.split(";"):
+        name, sep, value = pair.partition("=")
+        if sep and value.isdigit():
+            usage[name.strip()] = int(value)
+    return usage
+
+# Tool input schemas, shared by the MCP and HTTP tool listings
+QUERY_DOCUMENTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {
+            "type": "string",
+            "description": "SQL query to execute"
+        },
+        "parameters": {
+            "type": "array",
+            "items": {"type": "object"},
+            "description": "Optional query parameters"
+        },
+        "cross_partition": {
+            "type": "boolean",
+            "description": "Enable cross-partition query",
+            "default": True
+        },
+        "partition_key": {
+            "type": "string",
+            "description": "Optional partition key value; routes the query to a single partition"
+        },
+        "max_item_count": {
+            "type": "integer",
+            "description": "Documents fetched per Cosmos DB page",
+            "default": 100
+        },
+        "max_results": {
+            "type": "integer",
+            "description": "Maximum number of documents to return",
+            "default": 1000
+        },
+        "continuation_token": {
+            "type": "string",
+            "description": "Token from a previous single-partition response to fetch the next set of results; requires partition_key"
+        }
+    },
+    "required": ["query"]
+}
+
+READ_DOCUMENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "document_id": {
+            "type": "string",
+            "description": "Document ID to read"
+        },
+        "partition_key": {
+            "type": "string",
+            "description": "Partition key value"
+        }
+    },
+    "required": ["document_id", "partition_key"]
+}
+
+CONTAINER_STATISTICS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "exact": {
+            "type": "boolean",
+            "description": "Run a full COUNT query instead of using the container's quota metadata",
+            "default": False
+        }
+    },
+    "required": []
+}
+
+CREATE_DOCUMENTS_BULK_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "documents": {
+            "type": "array",
+            "items": {"type": "object"},
+            "description": "Documents to create; missing ids are generated"
+        },
+        "partition_key": {
+            "type": "string",
+            "description": "Optional partition key value shared by all documents"
+        }
+    },
+    "required": ["documents"]
+}
+
+# Static listings, shared by the MCP handlers and the HTTP routes
+RESOURCE_INFO = (
+    {
+        "uri": "cosmosdb://database",
+        "name": "Database Info",
+        "description": "Information about the connected Cosmos DB database",
+        "mimeType": "application/json"
+    },
+    {
+        "uri": "cosmosdb://container",
+        "name": "Container Info",
+        "description": "Information about the connected Cosmos DB container",
+        "mimeType": "application/json"
+    },
+    {
+        "uri": "cosmosdb://documents",
+        "name": "Documents",
+        "description": "Access to documents in the container",
+        "mimeType": "application/json"
+    }
+)
+
+TOOL_INFO = (
+    {
+        "name": "query_documents",
+        "description": "Execute a SQL query against Cosmos DB documents",
+        "inputSchema": QUERY_DOCUMENTS_SCHEMA
+    },
+    {
+        "name": "read_document",
+        "description": "Read a specific document by ID",
+        "inputSchema": READ_DOCUMENT_SCHEMA
+    },
+    {
+        "name": "get_container_statistics",
+        "description": "Get statistics about the container",
+        "inputSchema": CONTAINER_STATISTICS_SCHEMA
+    },
+    {
+        "name": "create_documents_bulk",
+        "description": "Create many documents in one call",
+        "inputSchema": CREATE_DOCUMENTS_BULK_SCHEMA
+    }
+)
+
+MCP_RESOURCES = tuple(
+    Resource(
+        uri=AnyUrl(info["uri"]),
+        name=info["name"],
+        description=info["description"],
+        mimeType=info["mimeType"]
+    )
+    for info in RESOURCE_INFO
+)
+MCP_TOOLS = tuple(Tool(**info) for info in TOOL_INFO)
+
+# Pre-encoded HTTP bodies for the static routes
+ROOT_JSON = _dumps_bytes({
+    "name": "Cosmos DB MCP Server",
+    "version": "1.0.0",
+    "description": "Model Context Protocol server for Azure Cosmos DB"
+})
+RESOURCES_JSON = _dumps_bytes({"resources": list(RESOURCE_INFO)})
+TOOLS_JSON = _dumps_bytes({"tools": list(TOOL_INFO)})
+
+def _etag(body: bytes) -> str:
+    """Strong ETag for a static response body"""
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+ROOT_ETAG = _etag(ROOT_JSON)
+RESOURCES_ETAG = _etag(RESOURCES_JSON)
+TOOLS_ETAG = _etag(TOOLS_JSON)
+
+# Handlers that need no server state live at module level and are
+# registered as-is instead of being rebuilt as closures per instance
+async def handle_list_resources() -> list[Resource]:
+    """List available Cosmos DB resources"""
+    return list(MCP_RESOURCES)
+
+async def handle_list_tools() -> list[Tool]:
+    """List available Cosmos DB tools"""
+    return list(MCP_TOOLS)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header (list, W/ tags or *) against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def _static_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Serve a pre-encoded body, or 304 when the client already has this version"""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def root(request: Request):
+    return _static_json_response(request, ROOT_JSON, ROOT_ETAG)
+
+async def list_resources(request: Request):
+    return _static_json_response(request, RESOURCES_JSON, RESOURCES_ETAG)
+
+async def list_tools(request: Request):
+    return _static_json_response(request, TOOLS_JSON, TOOLS_ETAG)
 
 class CosmosDBMCPServer:
     """MCP Server for Azure Cosmos DB operations"""
     
     def __init__(self):
-        self.config = self._load_config()
-        self.server_config = self._load_server_config()
+        self.config = get_cosmos_config()
+        self.server_config = get_server_config()
         self.cosmos_client: Optional[CosmosClient] = None
         self.database = None
         self.container = None
+        self._limiter = AdaptiveLimiter(int(os.getenv("COSMOS_MAX_INFLIGHT", "32")))
+        self._props_cache: dict = {}
+        # Hot point reads keyed by (partition_key, document_id)
+        self._read_cache = TTLCache(maxsize=1024, ttl=30)
+        # Statistics keyed by the exact flag: {exact: (computed_at, result)}
+        self._stats_cache: dict = {}
+        self._stats_ttl = float(os.getenv("STATS_TTL_SEC", "60"))
+        self._stats_lock = asyncio.Lock()
+        self._max_items_per_call = int(os.getenv("MAX_ITEMS_PER_CALL", "1000"))
+        self._metadata_task: Optional[asyncio.Task] = None
+        # Coalesced health probe: one in-flight read, result reused for 1s
+        self._health_task: Optional[asyncio.Task] = None
+        self._health_cached: Optional[tuple] = None
+        # Name -> handler maps shared by the MCP and HTTP entry points
+        self._tool_dispatch = {
+            "query_documents": self._query_documents,
+            "read_document": self._read_document,
+            "get_container_statistics": self._get_container_statistics,
+            "create_documents_bulk": self._create_documents_bulk
+        }
+        self._resource_dispatch = {
+            "cosmosdb://database": self._read_database_resource,
+            "cosmosdb://container": self._read_container_resource,
+            "cosmosdb://documents": self._read_documents_resource
+        }
         self.server = Server("cosmosdb-mcp-server")
-        self.app = FastAPI(title="Cosmos DB MCP Server", version="1.0.0")
+        self.app = FastAPI(
+            title="Cosmos DB MCP Server",
+            version="1.0.0",
+            # Encode route return values with orjson as well when it is installed
+            default_response_class=ORJSONResponse if orjson is not None else JSONResponse
+        )
         self._setup_handlers()
         self._setup_http_routes()
     
-    def _load_config(self) -> CosmosConfig:
-        """Load configuration from environment variables"""
-        return CosmosConfig(
-            endpoint=os.getenv("COSMOS_ENDPOINT", ""),
-            key=os.getenv("COSMOS_KEY", ""),
-            database_name=os.getenv("COSMOS_DATABASE_NAME", ""),
-            container_name=os.getenv("COSMOS_CONTAINER_NAME", ""),
-        )
-    
-    def _load_server_config(self) -> ServerConfig:
-        """Load HTTP server configuration from environment variables"""
-        return ServerConfig(
-            host=os.getenv("SERVER_HOST", "localhost"),
-            port=int(os.getenv("SERVER_PORT", "8000")),
-            log_level=os.getenv("LOG_LEVEL", "info")
-        )
-    
     async def _initialize_cosmos_client(self):
-        """Initialize Azure Cosmos DB client and verify connection"""
+        """Attach the shared Azure Cosmos DB client to this server"""
         try:
-            self.cosmos_client = CosmosClient(
-                url=self.config.endpoint,
-                credential=self.config.key
-            )
-            
-            # Get database reference
-            self.database = self.cosmos_client.get_database_client(self.config.database_name)
-            
-            # Get container reference
-            self.container = self.database.get_container_client(self.config.container_name)
-            
-            # Test connection
-            await self.database.read()
-            logger.info(f"Successfully connected to Cosmos DB: {self.config.database_name}")
-            
+            self.cosmos_client, self.database, self.container = await get_client(self.config)
         except Exception as e:
             logger.error(f"Failed to initialize Cosmos DB client: {str(e)}")
             raise
     
+    async def _call(self, coro_factory):
+        """Run a Cosmos DB operation under the adaptive concurrency limit"""
+        async with self._limiter:
+            try:
+                result = await coro_factory()
+            except CosmosHttpResponseError as e:
+                if e.status_code in (429, 503):
+                    self._limiter.on_throttle()
+                raise
+            # Adjust before the slot is released so waiters see the new limit
+            self._limiter.on_success()
+        return result
+    
+    async def _cached_props(self, kind: str, ttl: float = 300, refresh: bool = False) -> dict:
+        """Return database or container properties, re-reading them at most every ttl seconds"""
+        cached = self._props_cache.get(kind)
+        if not refresh and cached and cached[1] > time.monotonic():
+            return cached[0]
+        
+        proxy = self.database if kind == "database" else self.container
+        props = await self._call(proxy.read)
+        self._props_cache[kind] = (props, time.monotonic() + ttl)
+        return props
+    
+    async def _prefetch_metadata(self):
+        """Read database and container properties into the cache"""
+        await asyncio.gather(
+            self._cached_props("database", refresh=True),
+            self._cached_props("container", refresh=True)
+        )
+    
+    async def _refresh_metadata(self, interval: float = 240):
+        """Re-read metadata before the cached copies expire so requests never wait on it"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._prefetch_metadata()
+            except Exception as e:
+                logger.warning(f"Failed to refresh Cosmos DB metadata: {str(e)}")
+    
+    async def close(self):
+        """Release the shared Cosmos DB client at shutdown"""
+        if self._metadata_task is not None:
+            self._metadata_task.cancel()
+            self._metadata_task = None
+        await close_client()
+        self.cosmos_client, self.database, self.container = None, None, None
+    
     def _setup_handlers(self):
         """Setup MCP server handlers"""
-        
-        @self.server.list_resources()
-        async def handle_list_resources() -> list[Resource]:
-            """List available Cosmos DB resources"""
-            return [
-                Resource(
-                    uri=AnyUrl("cosmosdb://database"),
-                    name="Database Info",
-                    description="Information about the connected Cosmos DB database",
-                    mimeType="application/json"
-                ),
-                Resource(
-                    uri=AnyUrl("cosmosdb://container"),
-                    name="Container Info", 
-                    description="Information about the connected Cosmos DB container",
-                    mimeType="application/json"
-                ),
-                Resource(
-                    uri=AnyUrl("cosmosdb://documents"),
-                    name="Documents",
-                    description="Access to documents in the container",
-                    mimeType="application/json"
-                )
-            ]
-        
-        @self.server.read_resource()
-        async def handle_read_resource(uri: AnyUrl) -> str:
-            """Read a specific Cosmos DB resource"""
-            if not self.cosmos_client:
-                await self._initialize_cosmos_client()
-            
-            if not self.database or not self.container:
-                raise RuntimeError("Database or container not initialized")
-            
-            uri_str = str(uri)
-            if uri_str == "cosmosdb://database":
-                db_info = await self.database.read()
-                return f"Database: {db_info['id']}\nCreated: {db_info.get('_ts', 'N/A')}"
-            
-            elif uri_str == "cosmosdb://container":
-                container_info = await self.container.read()
-                return f"Container: {container_info['id']}\nPartition Key: {container_info.get('partitionKey', 'N/A')}"
-            
-            elif uri_str == "cosmosdb://documents":
-                # Return a sample of documents
-                items = []
-                async for item in self.container.query_items(
-                    query="SELECT TOP 10 * FROM c"
-                ):
-                    items.append(item)
-                return f"Sample documents (first 10):\n{items}"
+        self.server.list_resources()(handle_list_resources)
+        self.server.read_resource()(self.handle_read_resource)
+        self.server.list_tools()(handle_list_tools)
+        self.server.call_tool()(self.handle_call_tool)
+    
+    async def handle_read_resource(self, uri: AnyUrl) -> str:
+        """Read a specific Cosmos DB resource"""
+        # pydantic v2 fast path for the URL text
+        return await self._read_resource_impl(uri.unicode_string())
+    
+    async def handle_call_tool(self, name: str, arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+        """Handle tool calls"""
+        try:
+            result = await self._call_tool_impl(name, arguments)
+            return [TextContent(type="text", text=_dumps(result))]
             
-            else:
-                raise ValueError(f"Unknown resource URI: {uri_str}")
+        except Exception as e:
+            error_msg = f"Error executing {name}: {str(e)}"
+            logger.error(error_msg)
+            return [TextContent(type="text", text=error_msg)]
+    
+    async def _read_resource_impl(self, uri_str: str) -> str:
+        """Read a resource by URI; shared by the MCP and HTTP entry points"""
+        await self._initialize_cosmos_client()
         
-        @self.server.list_tools()
-        async def handle_list_tools() -> list[Tool]:
-            """List available Cosmos DB tools"""
-            return [
-                Tool(
-                    name="query_documents",
-                    description="Execute a SQL query against Cosmos DB documents",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "SQL query to execute"
-                            },
-                            "parameters": {
-                                "type": "array",
-                                "items": {"type": "object"},
-                                "description": "Optional query parameters"
-                            },
-                            "cross_partition": {
-                                "type": "boolean",
-                                "description": "Enable cross-partition query",
-                                "default": True
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                ),
-                Tool(
-                    name="read_document",
-                    description="Read a specific document by ID",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "document_id": {
-                                "type": "string",
-                                "description": "Document ID to read"
-                            },
-                            "partition_key": {
-                                "type": "string",
-                                "description": "Partition key value"
-                            }
-                        },
-                        "required": ["document_id", "partition_key"]
-                    }
-                ),             
-                Tool(
-                    name="get_container_statistics",
-                    description="Get statistics about the container",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                )
-            ]
+        reader = self._resource_dispatch.get(uri_str)
+        if reader is None:
+            raise ValueError(f"Unknown resource URI: {uri_str}")
+        return await reader()
+    
+    async def _call_tool_impl(self, name: str, arguments: dict) -> dict:
+        """Run a tool by name; shared by the MCP and HTTP entry points"""
+        await self._initialize_cosmos_client()
         
-        @self.server.call_tool()
-        async def handle_call_tool(name: str, arguments: dict) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-            """Handle tool calls"""
-            if not self.cosmos_client:
-                await self._initialize_cosmos_client()
-            
-            try:
-                if name == "query_documents":
-                    result = await self._query_documents(arguments)
-                elif name == "read_document":
-                    result = await self._read_document(arguments)
-                elif name == "get_container_statistics":
-                    result = await self._get_container_statistics()
-                else:
-                    raise ValueError(f"Unknown tool: {name}")
-                
-                return [TextContent(type="text", text=str(result))]
-                
-            except Exception as e:
-                error_msg = f"Error executing {name}: {str(e)}"
-                logger.error(error_msg)
-                return [TextContent(type="text", text=error_msg)]
+        handler = self._tool_dispatch.get(name)
+        if handler is None:
+            raise ValueError(f"Unknown tool: {name}")
+        return await handler(arguments)
+    
+    async def _read_database_resource(self) -> str:
+        """Render the cosmosdb://database resource"""
+        db_info = await self._cached_props("database")
+        return _dumps({"id": db_info["id"], "ts": db_info.get("_ts")})
+    
+    async def _read_container_resource(self) -> str:
+        """Render the cosmosdb://container resource"""
+        container_info = await self._cached_props("container")
+        return _dumps({"id": container_info["id"], "partition_key": container_info.get("partitionKey")})
+    
+    async def _read_documents_resource(self) -> str:
+        """Render the cosmosdb://documents resource"""
+        items = await self._call(self._sample_documents)
+        return _dumps(items)
     
     async def _query_documents(self, arguments: dict) -> dict:
         """Execute a query against Cosmos DB"""
-        if not self.container:
-            raise RuntimeError("Container not initialized")
-            
         query = arguments["query"]
         parameters = arguments.get("parameters", [])
         cross_partition = arguments.get("cross_partition", True)
+        requested_results = arguments.get("max_results", 1000)
+        requested_page_size = arguments.get("max_item_count", 100)
+        # 0 or -1 (Cosmos DB's dynamic page size) would let the first page
+        # through whole and bypass MAX_ITEMS_PER_CALL
+        if requested_results < 1 or requested_page_size < 1:
+            raise ValueError("max_results and max_item_count must be at least 1")
+        max_results = min(requested_results, self._max_items_per_call)
+        # Pages never exceed the cap, so a whole page always fits in the result
+        max_item_count = min(requested_page_size, max_results)
+        continuation_token = arguments.get("continuation_token")
         
-        items = []
-        async for item in self.container.query_items(
-            query=query,
-            parameters=parameters
-        ):
-            items.append(item)
+        query_kwargs = {
+            "query": query,
+            "parameters": parameters,
+            "max_item_count": max_item_count
+        }
+        # A partition key sends the query straight to one partition, where
+        # Optimistic Direct Execution skips the query plan and fan-out
+        partition_key = arguments.get("partition_key")
+        if partition_key is not None:
+            query_kwargs["partition_key"] = partition_key
+        elif not cross_partition:
+            # The async SDK always fans out without a key, so a caller that
+            # opted out of cross-partition queries must name the partition
+            raise ValueError("partition_key is required when cross_partition is false")
+        # The SDK's cross-partition aggregator does not track per-partition
+        # continuations; its token is just the last partition's header and
+        # replaying it would skip or duplicate documents.
+        if continuation_token is not None and partition_key is None:
+            raise ValueError("continuation_token requires partition_key")
+        
+        async def run_single_partition_query():
+            # Copy whole pages in bulk and only fetch another one while a full
+            # page still fits under the cap. Stopping on a page boundary means
+            # the continuation token resumes exactly after the last document.
+            items = []
+            pager = self.container.query_items(**query_kwargs).by_page(continuation_token)
+            async for page in pager:
+                items.extend([item async for item in page])
+                if len(items) + max_item_count > max_results:
+                    break
+            return items, pager.continuation_token
+        
+        async def run_cross_partition_query():
+            # Copy whole pages in bulk, and stop pulling pages once the cap
+            # is exceeded; going past it is how we know the result was truncated.
+            items = []
+            async for page in self.container.query_items(**query_kwargs).by_page():
+                items.extend([item async for item in page])
+                if len(items) > max_results:
+                    return items[:max_results], True
+            return items, False
+        
+        if partition_key is None:
+            items, truncated = await self._call(run_cross_partition_query)
+            return {
+                "query": query,
+                "result_count": len(items),
+                "truncated": truncated,
+                "documents": items
+            }
+            
+        items, next_token = await self._call(run_single_partition_query)
         
         return {
             "query": query,
             "result_count": len(items),
+            "truncated": next_token is not None,
+            "continuation_token": next_token,
             "documents": items
         }
         
     async def _read_document(self, arguments: dict) -> dict:
         """Read a document by ID"""
-        if not self.container:
-            raise RuntimeError("Container not initialized")
-            
         document_id = arguments["document_id"]
         partition_key = arguments["partition_key"]
         
-        document = await self.container.read_item(
+        cache_key = (partition_key, document_id)
+        document = self._read_cache.get(cache_key)
+        if document is not None:
+            return {
+                "status": "cached",
+                "document": document
+            }
+        
+        # Retry outside the limiter so backoff sleeps do not hold a slot
+        document = await _retry(lambda: self._call(lambda: self.container.read_item(
             item=document_id,
             partition_key=partition_key
-        )
+        )))
+        self._read_cache.set(cache_key, document)
         
         return {
             "status": "found",
             "document": document
         }
         
-    async def _get_container_statistics(self) -> dict:
-        """Get container statistics"""
-        if not self.container:
-            raise RuntimeError("Container not initialized")
+    async def _create_documents_bulk(self, arguments: dict) -> dict:
+        """Create documents with one transactional batch or concurrent creates"""
+        documents = arguments["documents"]
+        for document in documents:
+            if "id" not in document:
+                document["id"] = uuid4().hex
+        
+        container_props = await self._cached_props("container")
+        key_path = container_props.get("partitionKey", {}).get("paths", ["/id"])[0]
+        partition_key = arguments.get("partition_key")
+        if partition_key is None:
+            keys = {_partition_key_value(document, key_path) for document in documents}
+            if len(keys) == 1:
+                partition_key = keys.pop()
+        
+        # A shared partition key fits in one atomic request, up to the
+        # service's per-batch operation limit
+        if partition_key is not None and 0 < len(documents) <= MAX_BATCH_OPERATIONS:
+            await self._call(lambda: self.container.execute_item_batch(
+                batch_operations=[("create", (document,)) for document in documents],
+                partition_key=partition_key
+            ))
+            return {
+                "mode": "batch",
+                "created_count": len(documents),
+                "failed": []
+            }
+        
+        # Otherwise fan out; the limiter bounds how many run at once
+        results = await asyncio.gather(
+            *[self._call(lambda d=document: self.container.create_item(body=d)) for document in documents],
+            return_exceptions=True
+        )
+        failed = [
+            {"id": document["id"], "error": str(result)}
+            for document, result in zip(documents, results)
+            if isinstance(result, Exception)
+        ]
+        return {
+            "mode": "parallel",
+            "created_count": len(documents) - len(failed),
+            "failed": failed
+        }
+        
+    async def _sample_documents(self) -> list:
+        """Fetch the first SAMPLE_DOCUMENT_COUNT documents for the documents resource"""
+        # Matching the page size to the TOP lets the first page satisfy the
+        # request without the gateway prefetching more
+        items = []
+        async for page in self.container.query_items(
+            query=SAMPLE_DOCUMENTS_QUERY,
+            max_item_count=SAMPLE_DOCUMENT_COUNT
+        ).by_page():
+            items.extend([item async for item in page])
+            if len(items) >= SAMPLE_DOCUMENT_COUNT:
+                break
+        return items[:SAMPLE_DOCUMENT_COUNT]
+        
+    async def _count_documents(self) -> int:
+        """Count documents with a full COUNT query (this might be expensive for large containers)"""
+        count_query = "SELECT VALUE COUNT(1) FROM c"
+        # The SDK aggregates the per-partition counts into a single value
+        async for document_count in self.container.query_items(
+            query=count_query
+        ):
+            return document_count
+        return 0
+        
+    async def _get_container_statistics(self, arguments: dict) -> dict:
+        """Get container statistics, served from a short-lived cache"""
+        exact = arguments.get("exact", False)
+        cached = self._stats_cache.get(exact)
+        if cached and time.monotonic() - cached[0] < self._stats_ttl:
+            return cached[1]
+        
+        # Single-flight: concurrent misses wait for one read instead of each
+        # issuing their own
+        async with self._stats_lock:
+            cached = self._stats_cache.get(exact)
+            if cached and time.monotonic() - cached[0] < self._stats_ttl:
+                return cached[1]
             
+            result = await self._read_container_statistics(exact)
+            if "error" not in result:
+                self._stats_cache[exact] = (time.monotonic(), result)
+            return result
+    
+    async def _read_container_statistics(self, exact: bool) -> dict:
+        """Get container statistics"""
         try:
-            # Get container properties
-            container_props = await self.container.read()
-            
-            # Count documents (this might be expensive for large containers)
-            count_query = "SELECT VALUE COUNT(1) FROM c"
-            count_result = []
-            async for item in self.container.query_items(
-                query=count_query
-            ):
-                count_result.append(item)
-            
-            document_count = count_result[0] if count_result else 0
+            if exact:
+                # The properties read and the count are independent, so run
+                # both round-trips at once
+                container_props, document_count = await asyncio.gather(
+                    self._cached_props("container"),
+                    self._call(self._count_documents)
+                )
+                
+                counts = {
+                    "document_count": document_count,
+                    "exact": True
+                }
+            else:
+                # The quota headers carry the document count kept by the
+                # service, so one metadata read replaces a full scan
+                usage = {}
+                container_props = await self._call(lambda: self.container.read(
+                    populate_quota_info=True,
+                    response_hook=lambda headers, _: usage.update(
+                        _parse_resource_usage(headers.get("x-ms-resource-usage", ""))
+                    )
+                ))
+                
+                counts = {
+                    "approximate_document_count": usage.get("documentsCount"),
+                    "exact": False
+                }
             
             return {
                 "container_id": container_props["id"],
                 "partition_key": container_props.get("partitionKey", {}),
-                "document_count": document_count,
+                **counts,
                 "indexing_policy": container_props.get("indexingPolicy", {}),
                 "created_timestamp": container_props.get("_ts")
             }
@@ -307,156 +914,73 @@ class CosmosDBMCPServer:
                     "error": f"Failed to get statistics: {str(e)}"
                 }
     
-    def _setup_http_routes(self):
-        """Setup HTTP routes for the MCP server"""
-        
-        @self.app.get("/")
-        async def root():
-            return {
-                "name": "Cosmos DB MCP Server",
-                "version": "1.0.0",
-                "description": "Model Context Protocol server for Azure Cosmos DB"
-            }
-        
-        @self.app.get("/health")
-        async def health_check():
-            try:
-                if not self.cosmos_client:
-                    await self._initialize_cosmos_client()
-                if self.database:
-                    await self.database.read()
-                return {"status": "healthy", "database": "connected"}
-            except Exception as e:
-                return {"status": "unhealthy", "error": str(e)}
-        
-        @self.app.get("/mcp/resources")
-        async def list_resources():
-            try:
-                # Get resources directly from handler
-                resources = [
-                    {
-                        "uri": "cosmosdb://database",
-                        "name": "Database Info",
-                        "description": "Information about the connected Cosmos DB database",
-                        "mimeType": "application/json"
-                    },
-                    {
-                        "uri": "cosmosdb://container",
-                        "name": "Container Info", 
-                        "description": "Information about the connected Cosmos DB container",
-                        "mimeType": "application/json"
-                    },
-                    {
-                        "uri": "cosmosdb://documents",
-                        "name": "Documents",
-                        "description": "Access to documents in the container",
-                        "mimeType": "application/json"
-                    }
-                ]
-                return {"resources": resources}
-            except Exception as e:
-                return JSONResponse(content={"error": str(e)}, status_code=500)
-        
-        @self.app.get("/mcp/resources/{resource_path:path}")
-        async def read_resource(resource_path: str):
-            try:
-                if not self.cosmos_client:
-                    await self._initialize_cosmos_client()
-                
-                if not self.database or not self.container:
-                    raise RuntimeError("Database or container not initialized")
-                
-                uri_str = f"cosmosdb://{resource_path}"
-                if uri_str == "cosmosdb://database":
-                    db_info = await self.database.read()
-                    content = f"Database: {db_info['id']}\nCreated: {db_info.get('_ts', 'N/A')}"
-                elif uri_str == "cosmosdb://container":
-                    container_info = await self.container.read()
-                    content = f"Container: {container_info['id']}\nPartition Key: {container_info.get('partitionKey', 'N/A')}"
-                elif uri_str == "cosmosdb://documents":
-                    items = []
-                    async for item in self.container.query_items(query="SELECT TOP 10 * FROM c"):
-                        items.append(item)
-                    content = f"Sample documents (first 10):\n{items}"
-                else:
-                    raise ValueError(f"Unknown resource URI: {uri_str}")
-                
-                return {"content": content}
-            except Exception as e:
-                return JSONResponse(content={"error": str(e)}, status_code=500)
+    async def _probe_database(self):
+        """Verify the database is reachable"""
+        await self._initialize_cosmos_client()
+        await self._call(self.database.read)
+    
+    async def _check_health(self) -> dict:
+        """Report database connectivity, sharing one probe between concurrent callers"""
+        cached = self._health_cached
+        if cached and time.monotonic() - cached[0] < 1.0:
+            return cached[1]
         
-        @self.app.get("/mcp/tools")
-        async def list_tools():
-            try:
-                tools = [
-                    {
-                        "name": "query_documents",
-                        "description": "Execute a SQL query against Cosmos DB documents",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "query": {"type": "string", "description": "SQL query to execute"},
-                                "parameters": {"type": "array", "items": {"type": "object"}, "description": "Optional query parameters"},
-                                "cross_partition": {"type": "boolean", "description": "Enable cross-partition query", "default": True}
-                            },
-                            "required": ["query"]
-                        }
-                    },                    
-                    {
-                        "name": "read_document",
-                        "description": "Read a specific document by ID",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "document_id": {"type": "string", "description": "Document ID to read"},
-                                "partition_key": {"type": "string", "description": "Partition key value"}
-                            },
-                            "required": ["document_id", "partition_key"]
-                        }
-                    },
-                    {
-                        "name": "get_container_statistics",
-                        "description": "Get statistics about the container",
-                        "inputSchema": {"type": "object", "properties": {}, "required": []}
-                    }
-                ]
-                return {"tools": tools}
-            except Exception as e:
-                return JSONResponse(content={"error": str(e)}, status_code=500)
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._probe_database())
+        try:
+            # Shield so a disconnecting caller does not cancel the shared probe
+            await asyncio.shield(self._health_task)
+            result = {"status": "healthy", "database": "connected"}
+        except Exception as e:
+            result = {"status": "unhealthy", "error": str(e)}
         
-        @self.app.post("/mcp/tools/{tool_name}")
-        async def call_tool(tool_name: str, request: Request):
-            try:
-                body = await request.json()
-                arguments = body.get("arguments", {})
-                
-                if not self.cosmos_client:
-                    await self._initialize_cosmos_client()
-                
-                if tool_name == "query_documents":
-                    result = await self._query_documents(arguments)
-                elif tool_name == "read_document":
-                    result = await self._read_document(arguments)
-                elif tool_name == "get_container_statistics":
-                    result = await self._get_container_statistics()
-                else:
-                    raise ValueError(f"Unknown tool: {tool_name}")
-                
-                return {"result": [{"type": "text", "text": str(result)}]}
-                
-            except Exception as e:
-                error_msg = f"Error executing {tool_name}: {str(e)}"
-                logger.error(error_msg)
-                return JSONResponse(content={"error": error_msg}, status_code=500)
+        self._health_cached = (time.monotonic(), result)
+        return result
+    
+    def _setup_http_routes(self):
+        """Setup HTTP routes for the MCP server"""
+        self.app.on_event("shutdown")(self.close)
+        self.app.get("/")(root)
+        self.app.get("/health")(self._check_health)
+        self.app.get("/mcp/resources")(list_resources)
+        self.app.get("/mcp/resources/{resource_path:path}")(self.read_resource)
+        self.app.get("/mcp/tools")(list_tools)
+        self.app.post("/mcp/tools/{tool_name}")(self.call_tool)
+    
+    async def read_resource(self, resource_path: str):
+        """HTTP: read a resource"""
+        try:
+            return {"content": await self._read_resource_impl(f"cosmosdb://{resource_path}")}
+        except Exception as e:
+            return JSONResponse(content={"error": str(e)}, status_code=500)
+    
+    async def call_tool(self, tool_name: str, request: Request):
+        """HTTP: execute a tool"""
+        try:
+            # Parse the raw bytes ourselves; Starlette's request.json() goes
+            # through stdlib json
+            raw = await request.body()
+            body = _loads(raw) if raw else {}
+            arguments = body.get("arguments", {})
+            
+            result = await self._call_tool_impl(tool_name, arguments)
+            return {"result": [{"type": "text", "text": _dumps(result)}]}
+            
+        except Exception as e:
+            error_msg = f"Error executing {tool_name}: {str(e)}"
+            logger.error(error_msg)
+            return JSONResponse(content={"error": error_msg}, status_code=500)
     
     async def run(self):
         """Run the HTTP MCP server"""
-        # Validate configuration
-        if not all([self.config.endpoint, self.config.key, self.config.database_name, self.config.container_name]):
-            raise ValueError("Missing required Cosmos DB configuration. Please check your environment variables.")
-        
-        # Initialize Cosmos DB connection
+        # Warm the shared client before the first request; handlers then
+        # only take the lock-free fast path in get_client()
         await self._initialize_cosmos_client()
+        assert self.container is not None
+        
+        # Metadata reads dominate the first request, so pay them up front
+        await self._prefetch_metadata()
+        self._metadata_task = asyncio.create_task(self._refresh_metadata())
         
         # Start the HTTP server
         config = uvicorn.Config(
@@ -464,10 +988,17 @@ class CosmosDBMCPServer:
             host=self.server_config.host,
             port=self.server_config.port,
             log_level=self.server_config.log_level,
-            loop="asyncio"
+            # httptools' C parser when installed, h11 otherwise. There is no
+            # loop setting: serve() runs on the loop main() was started with.
+            http="auto",
+            access_log=self.server_config.access_log
         )
         server = uvicorn.Server(config)
-        await server.serve()
+        try:
+            await server.serve()
+        finally:
+            # Also covers serve() failing before the shutdown event; close() is idempotent
+            await self.close()
 
 async def main():
     """Main entry point"""
@@ -475,4 +1006,9 @@ async def main():
     await server.run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # libuv-backed event loop when available. uvloop.run() creates the loop
+    # itself, avoiding the deprecated event loop policy API.
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -6,60 +6,62 @@ import asyncio
 import aiohttp
 import json
 
+async def fetch_json(session, method, url, **kwargs):
+    """Issue a request and return (status, JSON body)"""
+    async with session.request(method, url, **kwargs) as response:
+        return response.status, await response.json()
+
 async def test_server():
     """Test the HTTP MCP server endpoints"""
     base_url = "http://localhost:8000"
-    
-    async with aiohttp.ClientSession() as session:
+
+    # One pooled session for every call; the connector limit leaves room to
+    # turn this into a load test by firing more requests concurrently
+    connector = aiohttp.TCPConnector(limit=100)
+    async with aiohttp.ClientSession(connector=connector) as session:
         try:
-            # Test server info
-            print("Testing server info...")
-            async with session.get(f"{base_url}/") as response:
-                data = await response.json()
-                print(f"Server info: {json.dumps(data, indent=2)}")
-            
-            # Test health check
-            print("\nTesting health check...")
-            async with session.get(f"{base_url}/health") as response:
-                data = await response.json()
-                print(f"Health check: {json.dumps(data, indent=2)}")
-            
-            # Test list resources
-            print("\nTesting list resources...")
-            async with session.get(f"{base_url}/mcp/resources") as response:
-                data = await response.json()
-                print(f"Resources: {json.dumps(data, indent=2)}")
-            
-            # Test list tools
-            print("\nTesting list tools...")
-            async with session.get(f"{base_url}/mcp/tools") as response:
-                data = await response.json()
-                print(f"Tools: {len(data.get('tools', []))} tools available")
-                for tool in data.get('tools', []):
-                    print(f"  - {tool['name']}: {tool['description']}")
-            
-            # Test query documents tool
-            print("\nTesting query documents tool...")
             query_data = {
                 "arguments": {
                     "query": "SELECT * FROM c"
                 }
             }
-            async with session.post(
-                f"{base_url}/mcp/tools/query_documents",
-                json=query_data
-            ) as response:
-                data = await response.json()
-                print(f"Query result status: {response.status}")
-                if response.status == 200:
-                    result = data.get('result', [])
-                    if result:
-                        print(f"Query successful: {len(result)} items in response")
-                    else:
-                        print("Query returned empty result")
+
+            # The endpoints are independent, so fetch them all at once
+            print("Testing server info, health check, resources, tools and query documents...")
+            (
+                (_, info),
+                (_, health),
+                (_, resources),
+                (_, tools),
+                (query_status, query_result)
+            ) = await asyncio.gather(
+                fetch_json(session, "GET", f"{base_url}/"),
+                fetch_json(session, "GET", f"{base_url}/health"),
+                fetch_json(session, "GET", f"{base_url}/mcp/resources"),
+                fetch_json(session, "GET", f"{base_url}/mcp/tools"),
+                fetch_json(session, "POST", f"{base_url}/mcp/tools/query_documents", json=query_data)
+            )
+
+            print(f"Server info: {json.dumps(info, indent=2)}")
+
+            print(f"\nHealth check: {json.dumps(health, indent=2)}")
+
+            print(f"\nResources: {json.dumps(resources, indent=2)}")
+
+            print(f"\nTools: {len(tools.get('tools', []))} tools available")
+            for tool in tools.get('tools', []):
+                print(f"  - {tool['name']}: {tool['description']}")
+
+            print(f"\nQuery result status: {query_status}")
+            if query_status == 200:
+                result = query_result.get('result', [])
+                if result:
+                    print(f"Query successful: {len(result)} items in response")
                 else:
-                    print(f"Query error: {data}")
-            
+                    print("Query returned empty result")
+            else:
+                print(f"Query error: {query_result}")
+
         except aiohttp.ClientError as e:
             print(f"Connection error: {e}")
             print("Make sure the server is running on http://localhost:8000")
@@ -71,5 +73,5 @@ if __name__ == "__main__":
     print("Make sure the server is running before running this test.")
     print("Start server with: python main.py")
     print("-" * 50)
-    
+
     asyncio.run(test_server())
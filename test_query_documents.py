@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Offline tests for query_documents pagination, run against a fake Cosmos DB container
+"""
+import os
+import unittest
+from unittest import mock
+
+import main
+
+
+class FakePage:
+    """One page of query results"""
+
+    def __init__(self, items):
+        self.items = items
+
+    async def __aiter__(self):
+        for item in self.items:
+            yield item
+
+
+class FakePager:
+    """Stands in for the SDK's by_page() iterator; the token is the next document index"""
+
+    def __init__(self, documents, page_size, continuation_token):
+        # Fail loudly instead of yielding empty pages forever
+        if page_size < 1:
+            raise AssertionError(f"invalid page size {page_size}")
+        self.documents = documents
+        self.page_size = page_size
+        self.position = int(continuation_token or 0)
+        self.continuation_token = continuation_token
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.position >= len(self.documents):
+            raise StopAsyncIteration
+        page = self.documents[self.position:self.position + self.page_size]
+        self.position += len(page)
+        self.continuation_token = str(self.position) if self.position < len(self.documents) else None
+        return FakePage(page)
+
+
+class FakeContainer:
+    """Container whose query_items() pages through a fixed document list"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.query_kwargs = []
+
+    def query_items(self, **kwargs):
+        self.query_kwargs.append(kwargs)
+        documents, page_size = self.documents, kwargs["max_item_count"]
+
+        class Query:
+            def by_page(self, continuation_token=None):
+                return FakePager(documents, page_size, continuation_token)
+
+        return Query()
+
+
+class QueryDocumentsTest(unittest.IsolatedAsyncioTestCase):
+    """Pagination, truncation and argument validation of _query_documents"""
+
+    def setUp(self):
+        env = {
+            "COSMOS_ENDPOINT": "https://example.documents.azure.com:443",
+            "COSMOS_KEY": "key",
+            "COSMOS_DATABASE_NAME": "db",
+            "COSMOS_CONTAINER_NAME": "container"
+        }
+        main.get_cosmos_config.cache_clear()
+        with mock.patch.dict(os.environ, env):
+            self.server = main.CosmosDBMCPServer()
+        main.get_cosmos_config.cache_clear()
+        self.documents = [{"id": str(i)} for i in range(25)]
+        self.server.container = FakeContainer(self.documents)
+
+    async def test_single_partition_continuation_round_trip(self):
+        arguments = {"query": "SELECT * FROM c", "partition_key": "p", "max_results": 10, "max_item_count": 4}
+        seen = []
+        token = None
+        for _ in range(len(self.documents)):
+            result = await self.server._query_documents({**arguments, "continuation_token": token})
+            self.assertLessEqual(result["result_count"], 10)
+            self.assertEqual(result["truncated"], result["continuation_token"] is not None)
+            seen.extend(document["id"] for document in result["documents"])
+            token = result["continuation_token"]
+            if token is None:
+                break
+
+        self.assertEqual(seen, [document["id"] for document in self.documents])
+        self.assertTrue(all(kwargs["partition_key"] == "p" for kwargs in self.server.container.query_kwargs))
+
+    async def test_cross_partition_truncated_flag(self):
+        result = await self.server._query_documents({"query": "SELECT * FROM c", "max_results": 10, "max_item_count": 4})
+        self.assertTrue(result["truncated"])
+        self.assertEqual(result["result_count"], 10)
+        self.assertNotIn("continuation_token", result)
+
+        result = await self.server._query_documents({"query": "SELECT * FROM c", "max_results": 25, "max_item_count": 4})
+        self.assertFalse(result["truncated"])
+        self.assertEqual(result["result_count"], 25)
+
+    async def test_continuation_token_requires_partition_key(self):
+        with self.assertRaises(ValueError):
+            await self.server._query_documents({"query": "SELECT * FROM c", "continuation_token": "8"})
+        self.assertEqual(self.server.container.query_kwargs, [])
+
+    async def test_limits_below_one_rejected(self):
+        for arguments in ({"max_results": 0}, {"max_item_count": 0}, {"max_item_count": -1}):
+            with self.subTest(**arguments):
+                with self.assertRaises(ValueError):
+                    await self.server._query_documents({"query": "SELECT * FROM c", **arguments})
+        self.assertEqual(self.server.container.query_kwargs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()